@@ -7,11 +7,12 @@ from .sensitivity_analysis.dissimilarity_measures import dissimilarity_measure
 from .sensitivity_analysis.extended_FAST import eFAST_indices
 from .sensitivity_analysis.gradient_boosting import xgboost_scores
 from .sensitivity_analysis.sobol_indices import sobol_indices
-from .utils import read_hdf5_array, write_hdf5_array
+from .utils import read_hdf5_array, write_hdf5_array, HDF5_CHUNK_CACHE_BYTES
 from pathlib import Path
 import pickle, json
 import time
 import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
 import h5py
 
 import plotly.graph_objects as go
@@ -35,6 +36,19 @@ interpreter_mapping = {
 }
 
 
+def run_model_shared_memory(model, shm_name, shape, dtype, start, end):
+    """Run ``model`` on rows ``start:end`` of the ``X_rescaled`` array stored in shared memory ``shm_name``."""
+    shm = SharedMemory(name=shm_name)
+    try:
+        X_rescaled = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        # Model outputs can be views of the shared buffer, so they are copied before it is closed
+        y = np.array(model(X_rescaled[start:end]), copy=True)
+        del X_rescaled
+    finally:
+        shm.close()
+    return y
+
+
 class Problem:
     """Definition of a global sensitivity analysis problem.
 
@@ -53,11 +67,21 @@ class Problem:
     seed : int
         Random seed.
     X : np.array of size [iterations, num_params]
-        Custom parameter sampling matrix in standard uniform [0,1] range.
+        Custom parameter sampling matrix in standard uniform [0,1] range. ``iterations`` defaults to its number of rows.
     cpus : int
         Number of cpus to use for parallel computations.
     available_memory : float
         Available RAM in GB for storing arrays in variables.
+    dtype : str
+        Data type in which parameter sampling matrices ``X`` and ``X_rescaled`` are stored. Samples are always
+        generated, rescaled and passed to the model in double precision. ``float32`` halves file sizes and I/O of
+        interpreters, but uniform samples close to 1 are rounded to 1.
+    compress : bool
+        Compress stored parameter sampling matrices and model outputs with shuffle and deflate filters in ``cpus``
+        threads. Files are smaller, but reading them is several times slower.
+    compute_kendall : bool
+        Compute Kendall tau-b in ``correlation_coefficients``, in addition to Pearson and Spearman. It takes longer
+        than both of them together.
 
     Raises
     ------
@@ -77,6 +101,9 @@ class Problem:
         cpus=None,
         available_memory=2,
         use_parallel=True,
+        dtype="float64",
+        compress=False,
+        compute_kendall=False,
     ):
         # Create necessary directories
         self.write_dir = Path(write_dir)
@@ -90,10 +117,12 @@ class Problem:
         self.interpreter_fnc = interpreter_mapping.get(self.interpreter_str)
         self.sampler_str = sampler
         # Iterations
-        self.iterations = self.guess_iterations(iterations)
+        self.iterations = self.guess_iterations(iterations, X=X)
         # For parallel computations
         ### 1. Chunk sizes limited by available memory
         self.available_memory = available_memory  # GB
+        self.dtype = np.dtype(dtype)
+        self.compress = compress
         self.bytes_per_entry = 8
         self.chunk_size_memory = min(
             int(
@@ -120,6 +149,7 @@ class Problem:
             "num_params": self.num_params,
             "write_dir": self.write_dir,
             "cpus": self.cpus,
+            "compute_kendall": compute_kendall,
         }
         # Generate samples
         self.gsa_dict.update(
@@ -128,10 +158,19 @@ class Problem:
                 "X": X,
             }
         )
-        self.gsa_dict.update({"filename_X": self.generate_samples()})
-        self.gsa_dict.update({"filename_X_rescaled": self.rescale_samples()})
+        # Arrays are passed on in memory, files are read only if results of a step already exist
+        filename_X, X_generated = self.generate_samples()
+        self.gsa_dict.update({"filename_X": filename_X})
+        filename_X_rescaled, X_rescaled = self.rescale_samples(X_generated)
+        del X_generated
+        self.gsa_dict.update({"filename_X_rescaled": filename_X_rescaled})
+        # Only correlation coefficients read samples, other interpreters need model outputs only
+        if self.interpreter_str == "correlation_coefficients":
+            self.gsa_dict.update({"X_rescaled_array": X_rescaled})
         # Run model
-        self.gsa_dict.update({"filename_y": self.run()})
+        filename_y, y = self.run(X_rescaled)
+        del X_rescaled
+        self.gsa_dict.update({"filename_y": filename_y, "y_array": y})
         # Compute GSA indices
         self.gsa_dict.update({"filename_sa_results": self.interpret()})
 
@@ -144,18 +183,44 @@ class Problem:
             # if not dir_path.exists():
             dir_path.mkdir(parents=True, exist_ok=True)
 
+    def guess_iterations(self, iterations=None, CONSTANT=10, X=None):
+        """Guess number of Monte Carlo iterations, unless ``iterations`` is given.
+
+        Custom samples ``X`` give one iteration per row. For correlation coefficients, this is the largest number of
+        iterations needed to estimate any of the coefficients with default confidence, otherwise ``CONSTANT``
+        iterations per parameter are used.
+
+        """
+        if iterations:
+            return iterations
+        if X is not None:
+            return len(X)
+        if self.interpreter_str == "correlation_coefficients":
+            corrcoef_constants = get_corrcoef_num_iterations()
+            return max(val["num_iterations"] for val in corrcoef_constants.values())
+        return self.num_params * CONSTANT
+
     def generate_samples(self, X=None):
         """Use ``self.sampler`` to generate normalized samples for this problem.
 
+        Parameters
+        ----------
+        X : np.array
+            Custom standard uniform samples, taken from ``gsa_dict["X"]`` if not given.
+
         Returns
         -------
         filename_X : str
             Path where parameter sampling matrix ``X`` for standard uniform samples is stored.
+        X : np.array or None
+            Generated or custom samples, or None if they were already stored in ``filename_X``.
 
         TODO Chris, this function is horrible.
 
         """
 
+        if X is None:
+            X = self.gsa_dict.get("X")
         self.base_sampler_str = "no_base"
         if self.interpreter_str == "sobol_indices":
             # Printing is OK, but not great on clusters. Consider using warnings and/or proper logging
@@ -181,7 +246,7 @@ class Problem:
                 }
             )
         else:
-            if X != None:
+            if X is not None:
                 self.sampler_str = "custom"
                 self.seed = None
         self.sampler_fnc = sampler_mapping.get(self.sampler_str, "random")
@@ -206,95 +271,170 @@ class Problem:
             )
         )
 
-        if not self.filename_X.exists():
-            X = self.sampler_fnc(self.gsa_dict)
-            write_hdf5_array(X, self.filename_X)
+        X_generated = None
+        if self.sampler_str == "custom":
+            # Custom samples are already in memory, they are passed on to ``rescale_samples`` without writing them
+            X_generated = np.asarray(X, dtype=np.float64)
+            if X_generated.shape != (self.iterations, self.num_params):
+                raise ValueError(
+                    "Custom samples X should have shape {}, got {}".format(
+                        (self.iterations, self.num_params), X_generated.shape
+                    )
+                )
+        elif not self.filename_X.exists():
+            X_generated = self.sampler_fnc(self.gsa_dict)
+            write_hdf5_array(
+                X_generated,
+                self.filename_X,
+                dtype=self.dtype,
+                compress=self.compress,
+                num_threads=self.cpus,
+            )
 
         # I don't like this changing global state, and then returning something as well.
         # This is a question of personal preference, but I would set global state on class instantiation, and then
         # change it as little as possible, just pass around the variables needed for each method.
 
-        return self.filename_X
+        return self.filename_X, X_generated
 
-    def rescale_samples(self):
+    def rescale_samples(self, X=None):
         """Rescale samples from standard uniform to appropriate distributions and write ``X_rescaled`` to a file.
 
+        Parameters
+        ----------
+        X : np.array
+            Standard uniform samples, read from ``filename_X`` if not given.
+
         Returns
         -------
         filename_X_rescaled : str
             Path where parameter sampling matrix ``X_rescaled`` for samples from appropriate distributions is stored.
+        X_rescaled : np.array or None
+            Rescaled samples, or None if they were already stored in ``filename_X_rescaled``.
 
         """
 
         self.filename_X_rescaled = self.filename_X.parent / Path(
             "X_rescaled" + self.filename_X.stem[1:] + ".hdf5"
         )
+        X_rescaled = None
         if not self.filename_X_rescaled.exists():
-            X = read_hdf5_array(self.filename_X)
+            if X is None:
+                X = read_hdf5_array(self.filename_X).astype(np.float64, copy=False)
             X_rescaled = self.model.__rescale__(X)
-            write_hdf5_array(X_rescaled, self.filename_X_rescaled)
-        return self.filename_X_rescaled
+            write_hdf5_array(
+                X_rescaled,
+                self.filename_X_rescaled,
+                dtype=self.dtype,
+                compress=self.compress,
+                num_threads=self.cpus,
+            )
+        return self.filename_X_rescaled, X_rescaled
 
-    def run_parallel(self):
-        """Obtain ``model`` outputs from the ``X_rescaled`` in parallel and write them to a file."""
+    def run_parallel(self, X_rescaled=None):
+        """Obtain ``model`` outputs from the ``X_rescaled`` in parallel, write them to a file and return them.
 
-        results_all = np.array([])
-        for i in range(self.num_chunks_memory):
+        Each chunk of ``X_rescaled`` is copied or read from ``filename_X_rescaled`` into shared memory, so workers get
+        only its name and their row ranges instead of pickled copies of the samples. Models get samples in double
+        precision, whatever the precision of the stored file is.
+
+        """
+
+        if X_rescaled is None:
             with h5py.File(self.filename_X_rescaled, "r") as f:
-                start = i * self.chunk_size_memory
-                end = (i + 1) * self.chunk_size_memory
-                X_rescaled = np.array(f["dataset"][start:end, :])
+                shape_all = f["dataset"].shape
+        else:
+            shape_all = X_rescaled.shape
+        dtype = np.dtype(np.float64)
+        results_all = []
+        for i in range(self.num_chunks_memory):
+            start = i * self.chunk_size_memory
+            end = min((i + 1) * self.chunk_size_memory, shape_all[0])
+            shape = (end - start, shape_all[1])
+            shm = SharedMemory(create=True, size=int(np.prod(shape)) * dtype.itemsize)
+            try:
+                X_chunk = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                if X_rescaled is None:
+                    with h5py.File(
+                        self.filename_X_rescaled,
+                        "r",
+                        rdcc_nbytes=HDF5_CHUNK_CACHE_BYTES,
+                    ) as f:
+                        f["dataset"].read_direct(X_chunk, np.s_[start:end, :])
+                else:
+                    X_chunk[:] = X_rescaled[start:end, :]
                 with multiprocessing.Pool(processes=self.cpus) as pool:
-                    results = pool.map(
-                        self.model,
+                    results = pool.starmap(
+                        run_model_shared_memory,
                         [
-                            X_rescaled[
-                                j
-                                * self.chunk_size_per_worker : (j + 1)
-                                * self.chunk_size_per_worker
-                            ]
+                            (
+                                self.model,
+                                shm.name,
+                                shape,
+                                dtype,
+                                j * self.chunk_size_per_worker,
+                                (j + 1) * self.chunk_size_per_worker,
+                            )
                             for j in range(self.num_jobs)
                         ],
                     )
-            results_array = np.array([])
-            for res in results:
-                results_array = np.hstack([results_array, res])
-            results_all = np.hstack([results_all, results_array])
-        write_hdf5_array(results_all, self.filename_y)
+                del X_chunk
+            finally:
+                shm.close()
+                shm.unlink()
+            results_all.extend(results)
+        results_all = np.concatenate(results_all)
+        write_hdf5_array(
+            results_all,
+            self.filename_y,
+            compress=self.compress,
+            num_threads=self.cpus,
+        )
+        return results_all
 
-    def run_sequential(self):
-        """Obtain ``model`` outputs from the ``X_rescaled`` sequentially and write them to a file."""
+    def run_sequential(self, X_rescaled=None):
+        """Obtain ``model`` outputs from the ``X_rescaled`` sequentially, write them to a file and return them."""
 
-        X_rescaled = read_hdf5_array(self.filename_X_rescaled)
+        if X_rescaled is None:
+            X_rescaled = read_hdf5_array(self.filename_X_rescaled).astype(
+                np.float64, copy=False
+            )
         y = self.model(X_rescaled)
-        write_hdf5_array(y, self.filename_y)
+        write_hdf5_array(
+            y, self.filename_y, compress=self.compress, num_threads=self.cpus
+        )
+        return y
 
-    def run(self):
+    def run(self, X_rescaled=None):
         """Wrapper function to obtain ``model`` outputs from the ``X_rescaled`` parameter sampling matrix.
 
-        Run Monte Carlo simulations in parallel or sequentially, and write results to a file.
+        Run Monte Carlo simulations in parallel or sequentially, and write results to a file. ``X_rescaled`` is read
+        from ``filename_X_rescaled`` if it is not given.
 
         Returns
         -------
         filename_y : str
             Path where model outputs ``y`` are stored.
+        y : np.array or None
+            Model outputs, or None if they were already stored in ``filename_y``.
 
         """
 
         self.filename_y = self.filename_X.parent / Path(
             "y" + self.filename_X.stem[1:] + ".hdf5"
         )
+        y = None
         if not self.filename_y.exists():
             t0 = time.time()
             if self.use_parallel:
-                self.run_parallel()
+                y = self.run_parallel(X_rescaled)
                 t1 = time.time()
                 print("run_parallel time: " + str(t1 - t0) + " seconds")
             else:
-                self.run_sequential()
+                y = self.run_sequential(X_rescaled)
                 t1 = time.time()
                 print("run_sequential time: " + str(t1 - t0) + " seconds")
-        return self.filename_y
+        return self.filename_y, y
 
     def interpret(self):
         """Computation of GSA indices.
@@ -306,10 +446,16 @@ class Problem:
 
         """
 
+        # Results with Kendall are stored separately, so that they are not read from a run without it
+        gsa_results_str = self.interpreter_str
+        if self.interpreter_str == "correlation_coefficients" and self.gsa_dict.get(
+            "compute_kendall"
+        ):
+            gsa_results_str += "_kendall"
         self.filename_gsa_results = (
             self.write_dir
             / "gsa_results"
-            / Path(self.interpreter_str + self.filename_X.stem[1:] + ".pickle")
+            / Path(gsa_results_str + self.filename_X.stem[1:] + ".pickle")
         )
         if not self.filename_gsa_results.exists():
             t0 = time.time()
@@ -321,7 +467,10 @@ class Problem:
         return self.filename_gsa_results
 
     def convergence(self, step, iterations_order):
-        y = read_hdf5_array(self.filename_y).flatten()
+        y = self.gsa_dict.get("y_array")
+        if y is None:
+            y = read_hdf5_array(self.filename_y)
+        y = y.ravel()
         sa_convergence_dict_temp = {}
         iterations_blocks = np.arange(step, len(y) + step, step)
         for block_size in iterations_blocks:
@@ -0,0 +1,164 @@
+import math
+import numpy as np
+from numba import njit, prange
+
+# Kernels are compiled on first use and cached on disk with ``cache=True``, so compilation is not repeated in every
+# Python session. Number of parameters processed by one thread in ``pearson_fused`` and ``sobol_sums_kernel``:
+KERNEL_COLUMN_BLOCK = 64
+
+
+@njit(cache=True)
+def _tie_sums(sorted_values):
+    """Compute tie statistics of a sorted array that are needed for Kendall tau-b and its variance."""
+    n = len(sorted_values)
+    tie, t0, t1 = 0, 0.0, 0.0
+    cnt = 1
+    for i in range(1, n + 1):
+        if i < n and sorted_values[i] == sorted_values[i - 1]:
+            cnt += 1
+        else:
+            tie += cnt * (cnt - 1) // 2
+            t0 += cnt * (cnt - 1.0) * (cnt - 2)
+            t1 += cnt * (cnt - 1.0) * (2 * cnt + 5)
+            cnt = 1
+    return tie, t0, t1
+
+
+@njit(cache=True)
+def _count_discordant(ranks, work):
+    """Count inversions in ``ranks`` with a bottom-up merge sort, ``work`` is a scratch array of the same size."""
+    n = len(ranks)
+    src, dst = ranks, work
+    dis = 0
+    width = 1
+    while width < n:
+        for lo in range(0, n, 2 * width):
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            i, j, k = lo, mid, lo
+            while i < mid and j < hi:
+                if src[j] < src[i]:
+                    dst[k] = src[j]
+                    dis += mid - i
+                    j += 1
+                else:
+                    dst[k] = src[i]
+                    i += 1
+                k += 1
+            while i < mid:
+                dst[k] = src[i]
+                i += 1
+                k += 1
+            while j < hi:
+                dst[k] = src[j]
+                j += 1
+                k += 1
+        src, dst = dst, src
+        width *= 2
+    return dis
+
+
+@njit(parallel=True, cache=True)
+def kendall_tau_b_batch(X, y):
+    """Compute Kendall tau-b and asymptotic p-values between all columns of X and y.
+
+    Uses the O(n log n) algorithm of Knight, where discordant pairs are counted as inversions of ``y`` ranks
+    after sorting by ``X[:, j]``. Ranks of ``y`` are computed once and shared by all columns.
+
+    """
+    n, num_params = X.shape
+    kendall = np.full(num_params, np.nan)
+    pval_kendall = np.full(num_params, np.nan)
+    # Dense ranks of y, sorted in ascending order
+    perm_y = np.argsort(y, kind="mergesort")
+    ry_sorted = np.empty(n, dtype=np.int64)
+    rank = 0
+    for i in range(n):
+        if i == 0 or y[perm_y[i]] != y[perm_y[i - 1]]:
+            rank += 1
+        ry_sorted[i] = rank
+    ytie, y0, y1 = _tie_sums(ry_sorted)
+    tot = n * (n - 1) // 2
+    m = n * (n - 1.0)
+    for j in prange(num_params):
+        # Stable sort on x keeps y ranks ascending within ties of x
+        x = X[perm_y, j]
+        perm_x = np.argsort(x, kind="mergesort")
+        x_sorted = x[perm_x]
+        ry = ry_sorted[perm_x]
+        xtie, x0, x1 = _tie_sums(x_sorted)
+        if xtie == tot or ytie == tot:
+            continue
+        ntie, cnt = 0, 1
+        for i in range(1, n + 1):
+            if i < n and x_sorted[i] == x_sorted[i - 1] and ry[i] == ry[i - 1]:
+                cnt += 1
+            else:
+                ntie += cnt * (cnt - 1) // 2
+                cnt = 1
+        dis = _count_discordant(ry, np.empty(n, dtype=np.int64))
+        con_minus_dis = tot - xtie - ytie + ntie - 2 * dis
+        tau = con_minus_dis / np.sqrt(tot - xtie) / np.sqrt(tot - ytie)
+        kendall[j] = min(1.0, max(-1.0, tau))
+        var = (m * (2 * n + 5) - x1 - y1) / 18 + 2.0 * xtie * ytie / m
+        if n > 2:
+            var += x0 * y0 / (9 * m * (n - 2))
+        pval_kendall[j] = math.erfc(abs(con_minus_dis) / np.sqrt(var) / np.sqrt(2.0))
+    return kendall, pval_kendall
+
+
+@njit(parallel=True, error_model="numpy", cache=True)
+def pearson_fused(Xc, yc, syy):
+    """Compute Pearson correlation coefficients between centered columns ``Xc`` and centered ``yc``.
+
+    ``syy`` is the sum of squares of ``yc``. Covariance and sum of squares of each column are accumulated in double
+    precision in one fused loop. Coefficients of columns with zero variance or non-finite values are set to 0.
+    ``fastmath`` is not used, since it assumes that there are no nan or inf values.
+
+    """
+    n, num_params = Xc.shape
+    sxy = np.zeros(num_params)
+    sxx = np.zeros(num_params)
+    num_blocks = (num_params + KERNEL_COLUMN_BLOCK - 1) // KERNEL_COLUMN_BLOCK
+    for k in prange(num_blocks):
+        start = k * KERNEL_COLUMN_BLOCK
+        end = min(start + KERNEL_COLUMN_BLOCK, num_params)
+        for i in range(n):
+            b = yc[i]
+            for j in range(start, end):
+                a = Xc[i, j]
+                sxy[j] += a * b
+                sxx[j] += a * a
+    pearson = np.zeros(num_params)
+    for j in range(num_params):
+        d = sxx[j] * syy
+        if d > 0 and np.isfinite(d) and np.isfinite(sxy[j]):
+            pearson[j] = sxy[j] / np.sqrt(d)
+    return pearson
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def sobol_sums_kernel(Y):
+    """Accumulate numerators of Sobol first and total order estimators over model outputs ``Y`` in Saltelli blocks.
+
+    Each row of ``Y`` is one block ``[A, AB_1, ..., AB_p, B]``. Returns sums of ``B * (AB_j - A)`` and
+    ``(AB_j - A) ** 2`` over rows, so that sums of consecutive row blocks of ``Y`` can be added up. Rows are traversed
+    in the outer loop, so that values of one block are read contiguously, and blocks of parameters are distributed
+    between threads.
+
+    """
+    N, step = Y.shape
+    num_params = step - 2
+    first = np.zeros(num_params)
+    total = np.zeros(num_params)
+    num_blocks = (num_params + KERNEL_COLUMN_BLOCK - 1) // KERNEL_COLUMN_BLOCK
+    for k in prange(num_blocks):
+        start = k * KERNEL_COLUMN_BLOCK
+        end = min(start + KERNEL_COLUMN_BLOCK, num_params)
+        for i in range(N):
+            a, b = Y[i, 0], Y[i, step - 1]
+            for j in range(start, end):
+                diff = Y[i, j + 1] - a
+                first[j] += b * diff
+                total[j] += diff * diff
+    return first, total
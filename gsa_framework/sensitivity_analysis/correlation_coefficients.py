@@ -1,14 +1,15 @@
 from ..utils import get_z_alpha_2, read_hdf5_array
+from ._gsa_kernels import kendall_tau_b_batch, pearson_fused
 import numpy as np
-from scipy.stats import kendalltau, spearmanr
+from scipy.stats import rankdata
 import h5py
 import multiprocessing
+from copy import deepcopy
+from functools import lru_cache
+from numba import get_num_threads, set_num_threads
+from threadpoolctl import threadpool_limits
 
 n0_DEFAULT = 10
-OPTIMAL_CHUNK_SIZE_PEARSON = (
-    500  # somewhat optimal chunk size for numpy.corrcoef that computes Pearson coeff.
-)
-get_chunk_size_pearson = lambda num_params: min(OPTIMAL_CHUNK_SIZE_PEARSON, num_params)
 OPTIMAL_CHUNK_SIZE_SPEARMAN = 100  # somewhat optimal chunk size for scipy.stats.spearmanr that computes Spearman coeff.
 get_chunk_size_spearman = lambda num_params: min(
     OPTIMAL_CHUNK_SIZE_SPEARMAN, num_params
@@ -16,112 +17,76 @@ get_chunk_size_spearman = lambda num_params: min(
 
 
 def kendalltau_mat(X, y):
-    """Compute Kendall tau-a correlation coefficients for all parameters."""
-    num_params = X.shape[1]
-    kendall, pval_kendall = np.zeros(num_params), np.zeros(num_params)
-    kendall[:], pval_kendall[:] = np.nan, np.nan
-    for i in range(num_params):
-        kendall_tuple = kendalltau(X[:, i], y)
-        kendall[i] = kendall_tuple[0]
-        pval_kendall[i] = kendall_tuple[1]
-    return kendall, pval_kendall
-
-
-def pearson_one_chunk(X, y):
-    """Compute Pearson correlation coefficient between all columns of X and y, set nan coefficients to 0."""
-    X_temp = np.hstack([X, y.reshape(X.shape[0], -1)]).T
-    pearson = np.corrcoef(X_temp)
-    pearson = pearson[:-1, -1]
-    pearson[np.isnan(pearson)] = 0
-    return pearson
+    """Compute Kendall tau-b correlation coefficients and their asymptotic p-values for all parameters.
 
+    As in ``scipy.stats.kendalltau``, coefficients and p-values are nan for columns of X with nan values, and for all
+    columns if y has nan values.
 
-def spearman_one_chunk(X, y):
-    """Compute Spearman correlation coefficient between all columns of X and y, set nan coefficients to 0."""
-    spearman = np.zeros(shape=X.shape[1])
-    var_X = np.var(X, axis=0)
-    var_0_where = np.where(var_X == 0)[0]
-    var_non0_where = np.setdiff1d(np.arange(X.shape[1]), var_0_where)
-    X_non0_var = X[:, var_non0_where]
-    # Spearman
-    spearman_non0, _ = spearmanr(X_non0_var, y)
-    spearman_non0 = spearman_non0[:-1, -1]
-    spearman[var_non0_where] = spearman_non0
-    return spearman
+    """
+    X = np.asarray(X)
+    y = np.asarray(y, dtype=np.float64).ravel()
+    if X.ndim != 2 or X.shape[0] != y.size:
+        raise ValueError(
+            "X should have one row per value of y, got shapes {} and {}".format(
+                X.shape, y.shape
+            )
+        )
+    if np.isnan(y).any():
+        return np.full(X.shape[1], np.nan), np.full(X.shape[1], np.nan)
+    kendall, pval_kendall = kendall_tau_b_batch(X, y)
+    if np.issubdtype(X.dtype, np.floating):
+        nan_columns = np.isnan(X).any(axis=0)
+        kendall[nan_columns] = np.nan
+        pval_kendall[nan_columns] = np.nan
+    return kendall, pval_kendall
 
 
-def corrcoef_many_chunks(X, y, option):
-    """Compute correlation coefficient given by ``option`` between all columns of X and y efficiently.
+def pearson_one_chunk(X, y):
+    """Compute Pearson correlation coefficient between all columns of X and y, set nan coefficients to 0.
 
-    This function computes correlations sequentially, by partitioning X into optimal number of columns
-    that was determined heuristically for ``option`` chosen as ``pearson`` or ``spearman``.
+    Only the correlations with ``y`` are needed, so instead of the full correlation matrix of ``[X, y]``, covariances
+    and variances of the centered columns are accumulated in one fused pass with ``pearson_fused``. X is read in its
+    own precision, e.g. single precision for ``float32`` samples, while the sums are accumulated in double precision.
 
     """
+    y_centered = np.asarray(y, dtype=np.float64).ravel()
+    if X.shape[0] != y_centered.size:
+        raise ValueError(
+            "X has {} rows, but y has {} values".format(X.shape[0], y_centered.size)
+        )
+    X_centered = X - X.mean(axis=0)
+    y_centered = y_centered - y_centered.mean()
+    return pearson_fused(X_centered, y_centered, float(y_centered @ y_centered))
 
-    if option == "pearson":
-        corrcoef_func = pearson_one_chunk
-        get_chunk_size = get_chunk_size_pearson
-    elif option == "spearman":
-        corrcoef_func = spearman_one_chunk
-        get_chunk_size = get_chunk_size_spearman
-    num_params = X.shape[1]
-    chunk_size = get_chunk_size(num_params)
-    num_chunks = int(np.ceil(num_params / chunk_size))
-    corrcoef = np.array([])
-    for i in range(num_chunks):
-        X_partial = X[:, i * chunk_size : (i + 1) * chunk_size]
-        corrcoef = np.hstack([corrcoef, corrcoef_func(X_partial, y)])
-    return corrcoef
 
+def _rank_columns(X):
+    """Rank each column of X separately, ties get the average of their ranks."""
+    return rankdata(X, axis=0)
 
-def corrcoef_parallel(
-    filename_X, y, num_params, cpus, option, selected_iterations=None
-):
-    """Compute correlation coefficient efficiently in parallel, using multiprocessing with one job per worker.
 
-    ``option`` can be ``pearson`` or ``spearman``.
+def spearman_one_chunk(X, y):
+    """Compute Spearman correlation coefficient between all columns of X and y, set nan coefficients to 0.
 
-    """
+    Spearman coefficient is the Pearson coefficient of the ranks, so columns of X and y are ranked once and passed
+    to ``pearson_one_chunk``. Zero variance columns have constant ranks and get zero coefficients there.
 
-    if option == "pearson":
-        get_chunk_size = get_chunk_size_pearson
-    elif option == "spearman":
-        get_chunk_size = get_chunk_size_spearman
-    chunk_size = get_chunk_size(num_params)
-    num_jobs = int(np.ceil(np.ceil(num_params / chunk_size) / cpus))
-    chunks = list(range(0, num_params + num_jobs * chunk_size, num_jobs * chunk_size))
-    cpus_needed = len(chunks) - 1
-    results_all = np.array([])
-    if selected_iterations is None:
-        selected_iterations = np.arange(len(y))
-    with h5py.File(filename_X, "r") as f:
-        X = np.array(f["dataset"][selected_iterations, :])
-        with multiprocessing.Pool(processes=cpus_needed) as pool:
-            results = pool.starmap(
-                corrcoef_many_chunks,
-                [
-                    (
-                        X[selected_iterations, chunks[i] : chunks[i + 1]],
-                        y[selected_iterations],
-                        option,
-                    )
-                    for i in range(cpus_needed)
-                ],
-            )
-        results_array = np.array([])
-        for res in results:
-            results_array = np.hstack([results_array, res])
-        results_all = np.hstack([results_all, results_array])
-    return results_all
+    """
+    X_ranks = _rank_columns(X)
+    if np.issubdtype(X.dtype, np.floating):
+        X_ranks = X_ranks.astype(X.dtype, copy=False)
+    return pearson_one_chunk(X_ranks, rankdata(y.ravel()))
 
 
 def correlation_coefficients(gsa_dict, selected_iterations=None):
-    """Compute estimations of different correlation coefficients, such as Pearson and Spearman.
+    """Compute estimations of different correlation coefficients, such as Pearson, Spearman and Kendall.
 
     Parameters
     ----------
     gsa_dict : dict
-        Dictionary that contains parameter sampling matrix ``X`` and model outputs ``y``.
+        Dictionary that contains parameter sampling matrix ``X`` and model outputs ``y``. Both are taken from
+        ``X_rescaled_array`` and ``y_array`` if they are in memory, otherwise they are read from
+        ``filename_X_rescaled`` and ``filename_y``. Kendall is computed only if ``compute_kendall`` is True, since it
+        takes longer than Pearson and Spearman together.
 
     Returns
     -------
@@ -130,19 +95,33 @@ def correlation_coefficients(gsa_dict, selected_iterations=None):
 
     """
 
-    num_params = gsa_dict["num_params"]
-    y = read_hdf5_array(gsa_dict["filename_y"])
-    y = y.flatten()
-    filename_X = gsa_dict["filename_X_rescaled"]
-    cpus = gsa_dict["cpus"]
-    return {
-        "pearson": corrcoef_parallel(
-            filename_X, y, num_params, cpus, "pearson", selected_iterations
-        ),
-        "spearman": corrcoef_parallel(
-            filename_X, y, num_params, cpus, "spearman", selected_iterations
-        ),
-    }
+    y = gsa_dict.get("y_array")
+    if y is None:
+        y = read_hdf5_array(gsa_dict["filename_y"])
+    y = y.ravel()
+    cpus = gsa_dict.get("cpus") or multiprocessing.cpu_count()
+    X = gsa_dict.get("X_rescaled_array")
+    if X is None:
+        X = read_hdf5_array(gsa_dict["filename_X_rescaled"])
+    if selected_iterations is not None:
+        X, y_selected = X[selected_iterations, :], y[selected_iterations]
+    else:
+        y_selected = y
+    # Coefficients are computed by multithreaded kernels that share X in memory, so no worker processes are needed.
+    # Threads of both BLAS and numba are bounded by ``cpus``.
+    num_threads = get_num_threads()
+    set_num_threads(min(cpus, num_threads))
+    try:
+        with threadpool_limits(limits=cpus):
+            sa_dict = {
+                "pearson": pearson_one_chunk(X, y_selected),
+                "spearman": spearman_one_chunk(X, y_selected),
+            }
+            if gsa_dict.get("compute_kendall", False):
+                sa_dict["kendall"] = kendalltau_mat(X, y_selected)[0]
+    finally:
+        set_num_threads(num_threads)
+    return sa_dict
 
 
 def get_corrcoef_num_iterations(theta=None, interval_width=0.1, confidence_level=0.99):
@@ -161,6 +140,7 @@ def get_corrcoef_num_iterations(theta=None, interval_width=0.1, confidence_level
     -------
     corrcoeff_constants : dict
         Dictionary with all constants that were used for the calculation of the number of iterations.
+        Results are cached, each call returns a new copy of the dictionary.
 
     References
     ----------
@@ -174,6 +154,15 @@ def get_corrcoef_num_iterations(theta=None, interval_width=0.1, confidence_level
 
     """
 
+    return deepcopy(
+        compute_corrcoef_num_iterations(theta, interval_width, confidence_level)
+    )
+
+
+@lru_cache(maxsize=32)
+def compute_corrcoef_num_iterations(theta, interval_width, confidence_level):
+    """Cached computation of ``get_corrcoef_num_iterations``, the returned dictionary should not be modified."""
+
     z_alpha_2 = get_z_alpha_2(confidence_level)
 
     corrcoeff_constants = {
@@ -183,7 +172,7 @@ def get_corrcoef_num_iterations(theta=None, interval_width=0.1, confidence_level
             "theta": theta or 0.95,
         },  # "hardest" correlation value to estimate
         "spearman": {"b": 3, "theta": theta or 0.8},
-        # "kendall": {"b": 4, "c": (0.437) ** 0.5, "theta": theta or 0.8},
+        "kendall": {"b": 4, "c": (0.437) ** 0.5, "theta": theta or 0.8},
     }
     corrcoeff_constants["spearman"]["c"] = (
         1 + corrcoeff_constants["spearman"]["theta"] ** 2 / 2
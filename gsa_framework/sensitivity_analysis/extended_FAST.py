@@ -54,8 +54,10 @@ def eFAST_indices(gsa_dict):
 
     """
 
-    y = read_hdf5_array(gsa_dict["filename_y"])
-    y = y.flatten()
+    y = gsa_dict.get("y_array")
+    if y is None:
+        y = read_hdf5_array(gsa_dict["filename_y"])
+    y = y.ravel()
     iterations = gsa_dict.get("iterations")
     num_params = gsa_dict.get("num_params")
     iterations_per_param = iterations // num_params
@@ -1,18 +1,32 @@
 import numpy as np
-from ..utils import get_z_alpha_2, read_hdf5_array
+import h5py
+from ..utils import get_z_alpha_2, HDF5_CHUNK_CACHE_BYTES
+from ._gsa_kernels import sobol_sums_kernel
+
+# Number of model outputs read at once when streaming y, 4M float64 values take 32 MB
+SOBOL_BLOCK_SIZE = 4 * 1024 ** 2
 
 # TODO confidence intervals
 
 
-def separate_output_values(y, num_params):
-    """Separate model output into values obtained from the sampling matrices A, B and AB."""
-    iterations_per_param = y.shape[0] // (num_params + 2)
-    AB = np.zeros((iterations_per_param, num_params))
+def reshape_output_values(y, num_params):
+    """Reshape model output to one block of Saltelli samples ``[A, AB_1, ..., AB_p, B]`` per row."""
     step = num_params + 2
-    A = y[0::step].reshape(iterations_per_param, -1)
-    B = y[(step - 1) :: step].reshape(iterations_per_param, -1)
-    for j in range(num_params):
-        AB[:, j] = y[(j + 1) :: step]
+    iterations_per_param = y.shape[0] // step
+    return y[: iterations_per_param * step].reshape(iterations_per_param, step)
+
+
+def separate_output_values(y, num_params):
+    """Separate model output into values obtained from the sampling matrices A, B and AB.
+
+    Saltelli samples are stored in blocks of ``num_params + 2`` rows ordered as ``[A, AB_1, ..., AB_p, B]``, so
+    reshaping ``y`` to one block per row gives A, B and AB as views without copying.
+
+    """
+    Y = reshape_output_values(y, num_params)
+    A = Y[:, :1]
+    B = Y[:, -1:]
+    AB = Y[:, 1:-1]
     return A, B, AB
 
 
@@ -29,6 +43,67 @@ def sobol_total_order(A, AB, B):
     return 0.5 * np.mean((A - AB) ** 2, axis=0) / np.var(np.r_[A, B], axis=0)
 
 
+def sobol_first_total_order(A, AB, B):
+    """First and total order estimators normalized by sample variance, computed in one pass over AB.
+
+    Gives the same values as ``sobol_first_order`` and ``sobol_total_order``, but ``AB - A`` is computed only once,
+    both numerators are reduced with matrix-vector products, and the variance of A and B is pooled without
+    concatenating them.
+
+    """
+    N = A.shape[0]
+    A, B = A.ravel(), B.ravel()
+    diff = AB - A[:, np.newaxis]
+    first_num = B @ diff / N
+    total_num = 0.5 * np.einsum("ij,ij->j", diff, diff) / N
+    mean = (A.sum() + B.sum()) / (2 * N)
+    var = (np.sum((A - mean) ** 2) + np.sum((B - mean) ** 2)) / (2 * N)
+    return first_num / var, total_num / var
+
+
+def sobol_first_total_order_blocks(y, num_params, block_size=SOBOL_BLOCK_SIZE):
+    """First and total order estimators normalized by sample variance, computed from ``y`` read in blocks.
+
+    ``y`` can be a vector, or an array or ``h5py.Dataset`` with one row or one column, as stored by
+    ``write_hdf5_array``. Only whole Saltelli blocks of about ``block_size`` values are read at once, so peak memory
+    does not depend on the number of iterations. Numerators of both estimators are summed over blocks, and the pooled
+    variance of A and B is combined between blocks with the parallel algorithm of Chan et al.
+
+    """
+    step = num_params + 2
+    if y.ndim == 2 and y.shape[0] != 1:
+        if y.shape[1] != 1:
+            raise ValueError(
+                "Model outputs should be a vector, got an array of shape {}".format(
+                    y.shape
+                )
+            )
+        read_values = lambda start, end: y[start:end, 0]
+    else:
+        read_values = lambda start, end: y[..., start:end]
+    iterations_per_param = y.size // step
+    rows_per_block = max(1, block_size // step)
+    first = np.zeros(num_params)
+    total = np.zeros(num_params)
+    count, mean, M2 = 0, 0.0, 0.0
+    for start in range(0, iterations_per_param, rows_per_block):
+        end = min(start + rows_per_block, iterations_per_param)
+        Y = np.asarray(read_values(start * step, end * step)).reshape(end - start, step)
+        first_sum, total_sum = sobol_sums_kernel(Y)
+        first += first_sum
+        total += total_sum
+        AB_values = Y[:, [0, -1]]
+        count_block = AB_values.size
+        mean_block = AB_values.mean()
+        delta = mean_block - mean
+        M2 += np.sum((AB_values - mean_block) ** 2)
+        M2 += delta ** 2 * count * count_block / (count + count_block)
+        mean += delta * count_block / (count + count_block)
+        count += count_block
+    var = M2 / count
+    return first / iterations_per_param / var, 0.5 * total / iterations_per_param / var
+
+
 def confidence_interval(std, N, confidence_level=0.95):
     z_alpha_2 = get_z_alpha_2(confidence_level)
     return z_alpha_2 * std / np.sqrt(N)
@@ -45,7 +120,8 @@ def sobol_indices(gsa_dict):
     ----------
     gsa_dict : dict
         Dictionary that contains model outputs ``y`` obtained by running model on Saltelli samples,
-        and number of parameters ``num_params``.
+        and number of parameters ``num_params``. Outputs are taken from ``y_array`` if they are in memory,
+        otherwise they are streamed from ``filename_y``.
 
     Returns
     -------
@@ -63,12 +139,16 @@ def sobol_indices(gsa_dict):
 
     """
 
-    y = read_hdf5_array(gsa_dict["filename_y"])
-    y = y.flatten()
     num_params = gsa_dict.get("num_params")
-    A, B, AB = separate_output_values(y, num_params)
-    first = sobol_first_order(A, AB, B)
-    total = sobol_total_order(A, AB, B)
+    y = gsa_dict.get("y_array")
+    if y is not None:
+        A, B, AB = separate_output_values(y.ravel(), num_params)
+        first, total = sobol_first_total_order(A, AB, B)
+    else:
+        with h5py.File(
+            gsa_dict["filename_y"], "r", rdcc_nbytes=HDF5_CHUNK_CACHE_BYTES
+        ) as f:
+            first, total = sobol_first_total_order_blocks(f["dataset"], num_params)
     # mean = np.mean(np.vstack([A,AB,B]), axis=0)
     # std  = np.std(np.vstack([A,AB,B]), axis=0)
     # iterations_per_parameter = A.shape[0]
@@ -1,27 +1,118 @@
 import numpy as np
 import h5py
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from scipy.stats import norm
 
-get_z_alpha_2 = lambda confidence_level: norm.ppf(0.5 + confidence_level / 2)
 
+@lru_cache(maxsize=None)
+def get_z_alpha_2(confidence_level):
+    """Compute z-score for two-sided ``confidence_level``, values are cached since only a few levels are used."""
+    return norm.ppf(0.5 + confidence_level / 2)
 
-def write_hdf5_array(array, filename):
-    """Write ``array`` to a file with an .hdf5 extension"""
-    try:
-        n_rows, n_cols = array.shape[0], array.shape[1]
-    except IndexError:
-        n_rows, n_cols = 1, array.shape[0]
 
+# Sampling matrices are read in ranges of columns, so one HDF5 chunk spans many rows and columns. Chunks are read as
+# a whole, so they are kept small enough to fit in the chunk cache several times.
+# Model outputs are stored as one row that is read in contiguous blocks, so their chunks are smaller.
+OPTIMAL_CHUNK_COLUMNS = 500
+MAX_CHUNK_BYTES = 16 * 1024 ** 2
+VECTOR_CHUNK_BYTES = 1024 ** 2
+HDF5_CHUNK_CACHE_BYTES = 128 * 1024 ** 2
+HDF5_COMPRESSION_LEVEL = 1  # fast deflate, the shuffle filter does most of the work
+
+
+def get_chunks(n_rows, n_cols, itemsize):
+    """Compute HDF5 chunk shape for a 2-dimensional array that is read in ranges of columns."""
+    if n_rows == 1:
+        return 1, min(n_cols, max(1, VECTOR_CHUNK_BYTES // itemsize))
+    chunk_cols = min(OPTIMAL_CHUNK_COLUMNS, n_cols)
+    chunk_rows = min(n_rows, max(1, MAX_CHUNK_BYTES // (chunk_cols * itemsize)))
+    return chunk_rows, chunk_cols
+
+
+def compress_chunk(chunk, chunk_shape, dtype):
+    """Apply HDF5 shuffle and deflate filters to ``chunk`` converted to ``dtype``.
+
+    Edge chunks are padded to the full ``chunk_shape``.
+
+    """
+    if chunk.shape != chunk_shape:
+        padded = np.zeros(chunk_shape, dtype=dtype)
+        padded[: chunk.shape[0], : chunk.shape[1]] = chunk
+        chunk = padded
+    chunk = np.ascontiguousarray(chunk, dtype=dtype)
+    shuffled = chunk.view(np.uint8).reshape(-1, chunk.dtype.itemsize).T
+    return zlib.compress(shuffled.tobytes(), HDF5_COMPRESSION_LEVEL)
+
+
+def write_direct_chunks(dataset, array, num_threads=1):
+    """Compress chunks of ``array`` in ``num_threads`` threads and write them to ``dataset`` bypassing HDF5 filters.
+
+    ``zlib`` releases the GIL, so chunks are compressed in parallel, while HDF5 would compress them one by one.
+    Chunks are processed in batches to limit the memory taken by compressed chunks that wait to be written.
+
+    """
+    chunk_rows, chunk_cols = dataset.chunks
+    offsets = [
+        (i, j)
+        for i in range(0, array.shape[0], chunk_rows)
+        for j in range(0, array.shape[1], chunk_cols)
+    ]
+    compress = lambda offset: compress_chunk(
+        array[
+            offset[0] : offset[0] + chunk_rows,
+            offset[1] : offset[1] + chunk_cols,
+        ],
+        dataset.chunks,
+        dataset.dtype,
+    )
+    batch_size = 2 * num_threads
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        for start in range(0, len(offsets), batch_size):
+            batch = offsets[start : start + batch_size]
+            for offset, data in zip(batch, executor.map(compress, batch)):
+                dataset.id.write_direct_chunk(offset, data)
+
+
+def write_hdf5_array(array, filename, dtype=None, compress=False, num_threads=1):
+    """Write ``array`` to a file with an .hdf5 extension.
+
+    Arrays are stored in chunks, 1-dimensional arrays are stored as one row. If ``dtype`` is given, values are
+    converted to it while writing. Compression with shuffle and deflate filters is optional. It makes files smaller,
+    but HDF5 decompresses chunks in one thread on every read, which is much slower than reading uncompressed chunks.
+    Compression is done in ``write_direct_chunks`` with ``num_threads`` threads.
+
+    """
+    dtype = array.dtype if dtype is None else np.dtype(dtype)
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    n_rows, n_cols = array.shape
+    storage = {}
+    if compress:
+        storage = {
+            "compression": "gzip",
+            "compression_opts": HDF5_COMPRESSION_LEVEL,
+            "shuffle": True,
+        }
     with h5py.File(filename, "w") as f:
         d = f.create_dataset(
-            "dataset", (n_rows, n_cols), maxshape=(n_rows, n_cols), dtype=array.dtype
+            "dataset",
+            (n_rows, n_cols),
+            maxshape=(n_rows, n_cols),
+            dtype=dtype,
+            chunks=get_chunks(n_rows, n_cols, dtype.itemsize),
+            **storage,
         )
-        d[:] = array
+        if compress:
+            write_direct_chunks(d, array, num_threads)
+        else:
+            d[:] = array
 
 
 def read_hdf5_array(filename):
     """Read ``array`` from a file with an .hdf5 extension"""
-    with h5py.File(filename, "r") as f:
+    with h5py.File(filename, "r", rdcc_nbytes=HDF5_CHUNK_CACHE_BYTES) as f:
         array = np.array(f["dataset"][:])
     return array
 
@@ -21,12 +21,15 @@ setup(
     package_data={
         "gsa_framework": [os.path.join("sampling", "data", "directions.npy")]
     },
+    python_requires=">=3.8",
     install_requires=[
         "h5py",
+        "numba",
         "numpy",
         "plotly",
         "scikit-learn",
         "scipy",
+        "threadpoolctl",
         "xgboost",
     ],
     url="https://github.com/aleksandra-kim/gsa_framework",
@@ -43,8 +46,7 @@ setup(
         "Operating System :: POSIX",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
         "Topic :: Scientific/Engineering :: Information Analysis",
         "Topic :: Scientific/Engineering :: Mathematics",
         "Topic :: Scientific/Engineering :: Visualization",
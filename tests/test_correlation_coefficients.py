@@ -0,0 +1,161 @@
+from gsa_framework.sensitivity_analysis.correlation_coefficients import (
+    correlation_coefficients,
+    kendalltau_mat,
+    pearson_one_chunk,
+    spearman_one_chunk,
+)
+from scipy.stats import kendalltau, pearsonr, spearmanr
+import numpy as np
+import pytest
+
+
+def test_kendalltau_mat():
+
+    for i in range(5):
+        iterations = np.random.randint(10, 500)
+        num_params = np.random.randint(1, 20)
+
+        # continuous samples and samples with ties
+        X = np.random.rand(iterations, num_params)
+        X[:, ::2] = np.round(X[:, ::2], 1)
+        y = np.round(np.random.rand(iterations) + X[:, 0], 1)
+
+        # ground truth
+        kendall_scipy = np.zeros(num_params)
+        pval_scipy = np.zeros(num_params)
+        for j in range(num_params):
+            kendall_scipy[j], pval_scipy[j] = kendalltau(
+                X[:, j], y, method="asymptotic"
+            )
+
+        # our implementation
+        kendall_gsa, pval_gsa = kendalltau_mat(X, y)
+
+        assert np.allclose(kendall_scipy, kendall_gsa)
+        assert np.allclose(pval_scipy, pval_gsa)
+
+
+def test_kendalltau_mat_nan():
+    """Columns with nan values get nan coefficients like in scipy, samples and outputs of different lengths raise."""
+
+    iterations, num_params = 100, 5
+    X = np.random.rand(iterations, num_params)
+    y = np.random.rand(iterations) + X[:, 1]
+    X[7, 2] = np.nan
+
+    kendall_gsa, pval_gsa = kendalltau_mat(X, y)
+    for j in range(num_params):
+        kendall_scipy, pval_scipy = kendalltau(X[:, j], y, method="asymptotic")
+        assert np.allclose(kendall_scipy, kendall_gsa[j], equal_nan=True)
+        assert np.allclose(pval_scipy, pval_gsa[j], equal_nan=True)
+    assert np.isnan(kendall_gsa[2])
+
+    y[5] = np.nan
+    kendall_gsa, pval_gsa = kendalltau_mat(X, y)
+    assert np.all(np.isnan(kendall_gsa)) and np.all(np.isnan(pval_gsa))
+
+    with pytest.raises(ValueError):
+        kendalltau_mat(X, y[:50])
+    with pytest.raises(ValueError):
+        kendalltau_mat(X[:50], y)
+
+
+def test_pearson_one_chunk():
+
+    for i in range(5):
+        iterations = np.random.randint(10, 500)
+        num_params = np.random.randint(2, 20)
+
+        X = np.random.rand(iterations, num_params)
+        X[:, 1] = 0.5  # zero variance parameter should get zero coefficient
+        y = np.random.rand(iterations) + X[:, 0]
+
+        # ground truth
+        pearson_scipy = np.zeros(num_params)
+        for j in range(num_params):
+            if j != 1:
+                pearson_scipy[j] = pearsonr(X[:, j], y)[0]
+
+        # our implementation, also with single precision samples
+        pearson_gsa = pearson_one_chunk(X, y)
+        pearson_gsa_float32 = pearson_one_chunk(X.astype(np.float32), y)
+
+        assert np.allclose(pearson_scipy, pearson_gsa)
+        assert np.allclose(pearson_scipy, pearson_gsa_float32, atol=1e-5)
+
+
+def test_pearson_one_chunk_non_finite():
+    """Columns with nan or inf values get zero coefficients, nan model outputs give zero coefficients everywhere."""
+
+    iterations, num_params = 100, 5
+    X = np.random.rand(iterations, num_params)
+    y = np.random.rand(iterations) + X[:, 1]
+    X[3, 0] = np.inf
+    X[7, 2] = np.nan
+
+    pearson_gsa = pearson_one_chunk(X, y)
+    for j in range(num_params):
+        if j in [0, 2]:
+            assert pearson_gsa[j] == 0
+        else:
+            assert np.allclose(pearsonr(X[:, j], y)[0], pearson_gsa[j])
+
+    y[5] = np.nan
+    assert np.array_equal(pearson_one_chunk(X, y), np.zeros(num_params))
+    y[5] = np.inf
+    assert np.array_equal(pearson_one_chunk(X, y), np.zeros(num_params))
+
+
+def test_pearson_one_chunk_shape():
+    """Model outputs and samples of different lengths are rejected before they reach the kernel."""
+
+    X = np.random.rand(100, 5)
+    with pytest.raises(ValueError):
+        pearson_one_chunk(X, np.random.rand(99))
+    with pytest.raises(ValueError):
+        pearson_one_chunk(X, np.random.rand(300))
+
+
+def test_spearman_one_chunk():
+
+    for i in range(5):
+        iterations = np.random.randint(10, 500)
+        num_params = np.random.randint(2, 20)
+
+        X = np.round(np.random.rand(iterations, num_params), 1)
+        X[:, 1] = 0.5  # zero variance parameter should get zero coefficient
+        y = np.random.rand(iterations) + X[:, 0]
+
+        # ground truth
+        spearman_scipy = np.zeros(num_params)
+        for j in range(num_params):
+            if j != 1:
+                spearman_scipy[j] = spearmanr(X[:, j], y)[0]
+
+        # our implementation, also with single precision samples
+        spearman_gsa = spearman_one_chunk(X, y)
+        spearman_gsa_float32 = spearman_one_chunk(X.astype(np.float32), y)
+
+        assert np.allclose(spearman_scipy, spearman_gsa)
+        assert np.allclose(spearman_scipy, spearman_gsa_float32, atol=1e-5)
+
+
+def test_correlation_coefficients():
+    """Kendall is computed only on request, for all and for selected iterations."""
+
+    iterations, num_params = 200, 6
+    X = np.random.rand(iterations, num_params)
+    y = np.random.rand(iterations) + X[:, 0]
+    gsa_dict = {"X_rescaled_array": X, "y_array": y, "cpus": 2}
+    selected_iterations = np.random.permutation(iterations)[:150]
+
+    sa_dict = correlation_coefficients(gsa_dict)
+    assert sorted(sa_dict) == ["pearson", "spearman"]
+    assert np.allclose(sa_dict["pearson"], pearson_one_chunk(X, y))
+
+    gsa_dict["compute_kendall"] = True
+    sa_dict = correlation_coefficients(gsa_dict, selected_iterations)
+    assert sorted(sa_dict) == ["kendall", "pearson", "spearman"]
+    X_selected, y_selected = X[selected_iterations, :], y[selected_iterations]
+    assert np.allclose(sa_dict["kendall"], kendalltau_mat(X_selected, y_selected)[0])
+    assert np.allclose(sa_dict["spearman"], spearman_one_chunk(X_selected, y_selected))
@@ -0,0 +1,78 @@
+from gsa_framework import Problem
+from gsa_framework.utils import read_hdf5_array
+import numpy as np
+import pickle
+import pytest
+
+
+class SumModel:
+    """Model that returns the sum of its parameters."""
+
+    def __init__(self, num_params):
+        self.num_params = num_params
+
+    def __len__(self):
+        return self.num_params
+
+    def __rescale__(self, X):
+        return X
+
+    def __call__(self, X):
+        return X.sum(axis=1)
+
+
+def test_custom_samples(tmp_path):
+    """Custom samples set the number of iterations, samples of the wrong shape are rejected."""
+
+    np.random.seed(1)
+    X = np.random.rand(300, 4)
+    problem = Problem(
+        "random",
+        SumModel(4),
+        "correlation_coefficients",
+        tmp_path / "default",
+        X=X,
+        use_parallel=False,
+    )
+    assert problem.iterations == 300
+    y = read_hdf5_array(problem.gsa_dict["filename_y"]).ravel()
+    assert np.allclose(y, X.sum(axis=1))
+
+    with pytest.raises(ValueError):
+        Problem(
+            "random",
+            SumModel(4),
+            "correlation_coefficients",
+            tmp_path / "iterations",
+            iterations=100,
+            X=X,
+            use_parallel=False,
+        )
+    with pytest.raises(ValueError):
+        Problem(
+            "random",
+            SumModel(5),
+            "correlation_coefficients",
+            tmp_path / "num_params",
+            X=X,
+            use_parallel=False,
+        )
+
+
+def test_compute_kendall(tmp_path):
+    """Problem computes Kendall only if it is requested, and does not reuse results of a run without it."""
+
+    X = np.random.rand(200, 4)
+    for compute_kendall in [False, True]:
+        problem = Problem(
+            "random",
+            SumModel(4),
+            "correlation_coefficients",
+            tmp_path,
+            X=X,
+            use_parallel=False,
+            compute_kendall=compute_kendall,
+        )
+        with open(problem.gsa_dict["filename_sa_results"], "rb") as f:
+            sa_dict = pickle.load(f)
+        assert ("kendall" in sa_dict) == compute_kendall
@@ -0,0 +1,31 @@
+from gsa_framework.utils import read_hdf5_array, write_hdf5_array
+import numpy as np
+
+
+def test_write_read(tmp_path):
+    """Arrays are the same after writing and reading, compressed chunks include padded edge chunks."""
+
+    filename = tmp_path / "array.hdf5"
+    for compress in [False, True]:
+        for shape in [(1, 1), (3, 2), (1000, 7), (5000, 1234)]:
+            for dtype in [np.float64, np.float32, np.int64]:
+                X = (np.random.rand(*shape) * 10).astype(dtype)
+                write_hdf5_array(X, filename, compress=compress, num_threads=2)
+                assert np.array_equal(read_hdf5_array(filename), X)
+
+        for size in [1, 1000, 300000]:
+            y = np.random.rand(size)
+            write_hdf5_array(y, filename, compress=compress, num_threads=2)
+            assert np.array_equal(read_hdf5_array(filename).flatten(), y)
+
+
+def test_write_read_dtype(tmp_path):
+    """Values are converted to ``dtype`` while writing."""
+
+    filename = tmp_path / "array.hdf5"
+    X = np.random.rand(3000, 700)
+    for compress in [False, True]:
+        write_hdf5_array(X, filename, dtype=np.float32, compress=compress)
+        X_float32 = read_hdf5_array(filename)
+        assert X_float32.dtype == np.float32
+        assert np.array_equal(X_float32, X.astype(np.float32))
@@ -0,0 +1,70 @@
+from gsa_framework import Problem
+from gsa_framework.gsa_framework import run_model_shared_memory
+from gsa_framework.utils import read_hdf5_array
+from multiprocessing.shared_memory import SharedMemory
+import multiprocessing
+import numpy as np
+
+
+class FirstColumnModel:
+    """Model that returns a view of its input, which is a column of the sampling matrix."""
+
+    def __init__(self, num_params):
+        self.num_params = num_params
+
+    def __len__(self):
+        return self.num_params
+
+    def __rescale__(self, X):
+        return X
+
+    def __call__(self, X):
+        return X[:, 0]
+
+
+def test_run_model_shared_memory():
+    """Model outputs are the same when they are views of the samples in shared memory."""
+
+    np.random.seed(1)
+    X = np.random.rand(200, 4)
+    shm = SharedMemory(create=True, size=X.nbytes)
+    try:
+        X_shared = np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)
+        X_shared[:] = X
+        with multiprocessing.Pool(processes=2) as pool:
+            results = pool.starmap(
+                run_model_shared_memory,
+                [
+                    (FirstColumnModel(4), shm.name, X.shape, X.dtype, start, start + 70)
+                    for start in range(0, 200, 70)
+                ],
+            )
+        del X_shared
+    finally:
+        shm.close()
+        shm.unlink()
+    assert np.array_equal(np.concatenate(results), X[:, 0])
+
+
+def test_run_parallel(tmp_path):
+    """Models get samples in double precision, only stored samples are in ``dtype``."""
+
+    for iterations in [1, 7, 200]:
+        for dtype, compress in [("float64", False), ("float32", True)]:
+            problem = Problem(
+                "random",
+                FirstColumnModel(4),
+                "correlation_coefficients",
+                tmp_path / (str(iterations) + dtype),
+                iterations=iterations,
+                seed=1,
+                cpus=2,
+                use_parallel=True,
+                dtype=dtype,
+                compress=compress,
+            )
+            X_rescaled = read_hdf5_array(problem.gsa_dict["filename_X_rescaled"])
+            y = read_hdf5_array(problem.gsa_dict["filename_y"]).ravel()
+            assert X_rescaled.dtype == dtype
+            assert y.dtype == np.float64
+            assert np.allclose(y, X_rescaled[:, 0], rtol=1e-6)
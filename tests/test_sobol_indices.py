@@ -0,0 +1,77 @@
+from gsa_framework.sensitivity_analysis.sobol_indices import (
+    separate_output_values,
+    sobol_first_total_order,
+    sobol_first_total_order_blocks,
+)
+from gsa_framework.utils import write_hdf5_array
+from SALib.analyze import sobol
+import numpy as np
+import h5py
+
+
+def test_separate_output_values():
+
+    for i in range(10):
+        iterations_per_param = np.random.randint(1, 1000)
+        num_params = np.random.randint(1, 100)
+        step = num_params + 2
+        y = np.random.rand(iterations_per_param * step)
+
+        # ground truth, Saltelli blocks are ordered as [A, AB_1, ..., AB_p, B]
+        A_true = y[0::step].reshape(-1, 1)
+        B_true = y[step - 1 :: step].reshape(-1, 1)
+        AB_true = np.zeros((iterations_per_param, num_params))
+        for j in range(num_params):
+            AB_true[:, j] = y[j + 1 :: step]
+
+        # our implementation
+        A, B, AB = separate_output_values(y, num_params)
+
+        assert np.array_equal(A, A_true)
+        assert np.array_equal(B, B_true)
+        assert np.array_equal(AB, AB_true)
+
+
+def test_sobol_first_total_order():
+
+    for i in range(10):
+        iterations_per_param = np.random.randint(2, 1000)
+        num_params = np.random.randint(1, 100)
+        y = np.random.rand(iterations_per_param * (num_params + 2))
+        A, B, AB = separate_output_values(y, num_params)
+
+        # ground truth
+        first_salib = np.zeros(num_params)
+        total_salib = np.zeros(num_params)
+        for j in range(num_params):
+            first_salib[j] = sobol.first_order(A[:, 0], AB[:, j], B[:, 0])
+            total_salib[j] = sobol.total_order(A[:, 0], AB[:, j], B[:, 0])
+
+        # our implementations
+        first_gsa, total_gsa = sobol_first_total_order(A, AB, B)
+        first_blocks, total_blocks = sobol_first_total_order_blocks(
+            y, num_params, block_size=np.random.randint(1, y.shape[0] + 1)
+        )
+
+        assert np.allclose(first_salib, first_gsa)
+        assert np.allclose(total_salib, total_gsa)
+        assert np.allclose(first_salib, first_blocks)
+        assert np.allclose(total_salib, total_blocks)
+
+
+def test_sobol_first_total_order_blocks_layout(tmp_path):
+    """Model outputs stored as one row or as one column give the same indices."""
+
+    filename = tmp_path / "y.hdf5"
+    num_params = 5
+    y = np.random.rand(300 * (num_params + 2))
+    A, B, AB = separate_output_values(y, num_params)
+    first, total = sobol_first_total_order(A, AB, B)
+    for shape in [(1, -1), (-1, 1)]:
+        write_hdf5_array(y.reshape(shape), filename)
+        with h5py.File(filename, "r") as f:
+            first_blocks, total_blocks = sobol_first_total_order_blocks(
+                f["dataset"], num_params, block_size=100
+            )
+        assert np.allclose(first, first_blocks)
+        assert np.allclose(total, total_blocks)